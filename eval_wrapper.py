@@ -1,23 +1,40 @@
 #!/usr/bin/env python3
-# eval_wrapper.py — compare your RAG (rag_single_llm_simple.py) vs base Mistral (no RAG)
+# eval_wrapper.py — compare your RAG (rag_single.py) vs base Mistral (no RAG)
 # - Batch mode over CSV: saves confusion matrices + accuracy bar + evaluation_results.csv
 # - Single-text mode: prints both raw outputs + parsed verdicts
 
-import os, sys, re, json, argparse, subprocess
+import os, sys, re, csv, json, argparse, hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import requests
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # headless: plots are only saved to PNG, never shown
 import matplotlib.pyplot as plt
 from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay, accuracy_score
 
+try:
+    import pyarrow as pa            # optional: multithreaded CSV parser + Arrow-backed columns
+    import pyarrow.csv as pa_csv
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+import rag_single  # imported once; every row reuses its cached corpus and Ollama session
+
 # ---------- Config ----------
-RAG_PROG       = os.environ.get("RAG_PROG", "rag_single_llm_simple.py")  # set to your RAG filename
 MISTRAL_MODEL  = os.environ.get("MISTRAL_MODEL", "mistral:7b")           # `ollama pull mistral:7b`
 TIMEOUT_SEC    = int(os.environ.get("EVAL_TIMEOUT", "180"))              # allow for first-load
 RETRY_WARMUP   = int(os.environ.get("EVAL_RETRY_WARMUP", "1"))           # 1 = try a warmup if first call fails
+NUM_PARALLEL   = rag_single.NUM_PARALLEL                                 # rows in flight (OLLAMA_NUM_PARALLEL)
 LABELS         = [0, 1, 2]                                               # 0=Real, 1=Fake, 2=Unknown
 LABEL_NAMES    = ["Real", "Fake", "Unknown"]
 
+# ---------- Patterns (compiled once; _parse_verdict runs per row) ----------
+_RE_MARKUP  = re.compile(r"\*\*|__|</?[^>]+>")                        # bold/underline + simple HTML tags
+_RE_VERDICT = re.compile(r"(?im)^\s*verdict:\s*(real|fake|uncertain)\b")
+
 # ---------- Parsers ----------
 def _parse_verdict(text: str) -> int:
     """
@@ -29,10 +46,8 @@ def _parse_verdict(text: str) -> int:
     if not text:
         return 2
     t = text.strip()
-    t = re.sub(r"\*\*|__", "", t)             # strip bold/underline
-    t = re.sub(r"</?[^>]+>", "", t)           # strip simple HTML tags
-    t = re.sub(r"[ \t]+", " ", t)
-    m = re.search(r"(?im)^\s*verdict:\s*(real|fake|uncertain)\b", t)
+    t = _RE_MARKUP.sub("", t)                 # strip bold/underline + simple HTML tags in one pass
+    m = _RE_VERDICT.search(t)
     if not m:
         # gentle fallback: if it says fake but not real → Fake; real but not fake → Real; else Unknown
         low = t.lower()
@@ -45,21 +60,21 @@ def _parse_verdict(text: str) -> int:
     return 0 if v == "real" else 1 if v == "fake" else 2
 
 # ---------- Executors ----------
+def _ollama_generate(model: str, prompt: str) -> str:
+    """POST to Ollama's /api/generate over the session shared with rag_single."""
+    return rag_single.ollama_generate(prompt, model=model, timeout=TIMEOUT_SEC)
+
 def run_rag(job_text: str) -> tuple[int, str]:
-    """Call your RAG script and parse 'Verdict:'."""
+    """Run the RAG pipeline in-process and parse 'Verdict:'."""
     try:
-        p = subprocess.run(
-            [sys.executable, RAG_PROG, "--text", job_text],
-            capture_output=True, text=True, timeout=TIMEOUT_SEC
-        )
-        out = (p.stdout or "") + (("\n" + p.stderr) if p.stderr else "")
-        return _parse_verdict(out), out
+        label, raw = rag_single.classify(job_text)
+        return label, raw
     except Exception as e:
         return 2, f"[RAG error] {e}"
 
 def run_mistral_plain(job_text: str) -> tuple[int, str]:
     """
-    Call base Mistral via Ollama CLI (no RAG).
+    Call base Mistral via the Ollama HTTP API (no RAG).
     Output format mirrors the RAG script to keep parsing identical.
     Warm-up retry helps on first model load.
     """
@@ -77,47 +92,68 @@ JOB POSTING:
 {job_text}
 """.strip()
 
-    cmd = ["ollama", "run", MISTRAL_MODEL]
     tries = 1 + max(0, RETRY_WARMUP)
     last_err = ""
     for _ in range(tries):
         try:
-            p = subprocess.run(
-                cmd, input=prompt, text=True, capture_output=True, timeout=TIMEOUT_SEC
-            )
-            out = (p.stdout or "").strip()
+            out = _ollama_generate(MISTRAL_MODEL, prompt).strip()
             if out:
                 return _parse_verdict(out), out
-            last_err = (p.stderr or "").strip()
-        except subprocess.TimeoutExpired:
+            last_err = "empty response"
+        except requests.Timeout:
             last_err = f"timeout after {TIMEOUT_SEC}s"
+        except requests.RequestException as e:
+            last_err = str(e)
 
         # warm up model before retry
-        try:
-            subprocess.run(["ollama", "run", MISTRAL_MODEL, "ok"], text=True, capture_output=True, timeout=30)
-        except Exception:
-            pass
+        rag_single.ollama_warmup(MISTRAL_MODEL, timeout=30)
 
     return 2, f"[Mistral error] {last_err or 'no output'}"
 
 # ---------- CSV utils ----------
-def _combine_text_row(row: pd.Series) -> str:
-    parts = []
-    for _, val in row.items():
-        if pd.isna(val): 
-            continue
-        s = str(val)
-        if len(s) < 3: 
-            continue
-        parts.append(s)
-    return "\n".join(parts)[:2000]
+def _combine_text(df: pd.DataFrame) -> pd.Series:
+    """
+    Per row: non-null cells with >= 3 chars joined in column order, whitespace collapsed to single
+    spaces, capped at 2000 chars. Done once here so the batch loop passes rows through untouched.
+    """
+    sdf = df.astype("string")
+    sdf.columns = pd.RangeIndex(sdf.shape[1])  # positional labels: stack() can't take repeated column names
+    sdf = sdf.where(sdf.apply(lambda col: col.str.len() >= 3, axis=0))
+    cells = sdf.stack().dropna()  # (row, column) in original order, short/NaN cells gone
+    text = cells.groupby(level=0, sort=False).agg(" ".join)
+    text = text.str.replace(r"\s+", " ", regex=True).str.strip()
+    return text.reindex(df.index, fill_value="").str.slice(0, 2000)
+
+def _read_csv(path: str) -> pd.DataFrame:
+    """
+    Every cell as its CSV text (label detection does its own pd.to_numeric), so the models see the same
+    posting text whichever parser ran. pyarrow parses when available, with every header column typed as a
+    string up front: pandas' engine="pyarrow" infers bools/numbers first and only casts afterwards. Arrow
+    rejects ragged rows instead of padding them like the C engine, and keeps duplicate header names that
+    the C engine renames (`1`, `1.1`, ...), so both cases go to the C engine for the same frame.
+    """
+    if HAVE_PYARROW:
+        with open(path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        if header and len(set(header)) == len(header):
+            opts = pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                strings_can_be_null=True,
+                null_values=pa_csv.ConvertOptions().null_values + ["<NA>", "None"],  # = pandas' NA strings
+            )
+            try:
+                table = pa_csv.read_csv(path, convert_options=opts)
+                return table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+            except pa.ArrowInvalid:
+                pass
+    return pd.read_csv(path, encoding="utf-8", on_bad_lines="skip", dtype="string")
 
 def load_dataset(path: str) -> tuple[pd.DataFrame, str]:
     """
     Heuristically detect a label column with {0,1[,2]} and build a combined text column.
     Returns df[[__text__, __label__]], label_col_name
     """
-    df = pd.read_csv(path, encoding="utf-8", on_bad_lines="skip")
+    df = _read_csv(path)
     label_col = None
     for c in df.columns[::-1]:
         try:
@@ -129,7 +165,7 @@ def load_dataset(path: str) -> tuple[pd.DataFrame, str]:
             pass
     if label_col is None:
         label_col = df.columns[-1]
-    df["__text__"]  = df.apply(_combine_text_row, axis=1)
+    df["__text__"]  = _combine_text(df)
     df["__label__"] = pd.to_numeric(df[label_col], errors="coerce").fillna(2).astype(int)
     return df[["__text__", "__label__"]], label_col
 
@@ -141,21 +177,21 @@ def plot_results(y_true, y_rag, y_mis):
     cm_rag = confusion_matrix(y_true, y_rag, labels=LABELS)
     cm_mis = confusion_matrix(y_true, y_mis, labels=LABELS)
 
-    plt.figure(figsize=(4.5,4))
-    ConfusionMatrixDisplay(cm_rag, display_labels=LABEL_NAMES).plot(values_format="d")
-    plt.title("Confusion Matrix — RAG")
-    plt.tight_layout(); plt.savefig("cm_rag.png", dpi=160)
+    fig, ax = plt.subplots(figsize=(4.5,4))
+    ConfusionMatrixDisplay(cm_rag, display_labels=LABEL_NAMES).plot(ax=ax, values_format="d")
+    ax.set_title("Confusion Matrix — RAG")
+    fig.tight_layout(); fig.savefig("cm_rag.png", dpi=160); plt.close(fig)
 
-    plt.figure(figsize=(4.5,4))
-    ConfusionMatrixDisplay(cm_mis, display_labels=LABEL_NAMES).plot(values_format="d")
-    plt.title("Confusion Matrix — Mistral (no RAG)")
-    plt.tight_layout(); plt.savefig("cm_mistral.png", dpi=160)
+    fig, ax = plt.subplots(figsize=(4.5,4))
+    ConfusionMatrixDisplay(cm_mis, display_labels=LABEL_NAMES).plot(ax=ax, values_format="d")
+    ax.set_title("Confusion Matrix — Mistral (no RAG)")
+    fig.tight_layout(); fig.savefig("cm_mistral.png", dpi=160); plt.close(fig)
 
-    plt.figure(figsize=(5,4))
-    plt.bar(["RAG","Mistral"], [acc_rag, acc_mis])
-    plt.ylabel("Accuracy")
-    plt.title("Model Performance: Accuracy")
-    plt.ylim(0,1); plt.tight_layout(); plt.savefig("rag_vs_mistral_accuracy.png", dpi=160)
+    fig, ax = plt.subplots(figsize=(5,4))
+    ax.bar(["RAG","Mistral"], [acc_rag, acc_mis])
+    ax.set_ylabel("Accuracy")
+    ax.set_title("Model Performance: Accuracy")
+    ax.set_ylim(0,1); fig.tight_layout(); fig.savefig("rag_vs_mistral_accuracy.png", dpi=160); plt.close(fig)
 
     return acc_rag, acc_mis
 
@@ -191,14 +227,34 @@ def main():
     print(f"Evaluating {len(df)} samples from '{args.dataset}' (label column: '{label_col}')")
 
     y_true = df["__label__"].tolist()
+    texts = df["__text__"].tolist()
     rag_preds, mis_preds = [], []
 
-    for idx, row in df.iterrows():
-        text = str(row["__text__"])[:2000]
+    def _eval_row(text: str) -> tuple[int, int]:
         r_label, _ = run_rag(text)
         m_label, _ = run_mistral_plain(text)
-        rag_preds.append(r_label); mis_preds.append(m_label)
-        print(f"[{len(rag_preds):02d}/{len(df)}] true={row['__label__']} rag={r_label} mis={m_label}")
+        return r_label, m_label
+
+    # Build the RAG corpus and load both models up front so worker threads don't race to load them,
+    # then keep up to NUM_PARALLEL rows in flight (start Ollama with OLLAMA_NUM_PARALLEL=4 to match).
+    rag_single._get_corpus()
+    for model in {MISTRAL_MODEL, rag_single.MODEL}:
+        rag_single.ollama_warmup(model, timeout=TIMEOUT_SEC)
+    # Identical postings only go to the models once; duplicates reuse the first result
+    keys = [hashlib.sha1(t.encode("utf-8", "ignore")).digest() for t in texts]
+    unique = dict(zip(keys, texts))                                 # key -> text, first-seen order
+    if len(unique) < len(keys):
+        print(f"Skipping {len(keys) - len(unique)} duplicate postings")
+
+    labels = {}
+    with ThreadPoolExecutor(max_workers=max(1, NUM_PARALLEL)) as pool:
+        results = pool.map(_eval_row, unique.values())             # yields in first-seen order
+        for true, key in zip(y_true, keys):
+            if key not in labels:
+                labels[key] = next(results)
+            r_label, m_label = labels[key]
+            rag_preds.append(r_label); mis_preds.append(m_label)
+            print(f"[{len(rag_preds):02d}/{len(df)}] true={true} rag={r_label} mis={m_label}")
 
     pd.DataFrame({
         "true": y_true, "rag_pred": rag_preds, "mistral_pred": mis_preds
@@ -1,26 +1,33 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import subprocess
+import os
+import sys
+from pathlib import Path
+
+# rag_single.py and data/ live one level up; resolve them from here rather than the cwd
+ROOT = Path(__file__).resolve().parent.parent
+os.environ.setdefault("RAG_DATA_DIR", str(ROOT / "data"))
+os.environ.setdefault("RAG_CACHE_DIR", str(ROOT / ".cache"))
+sys.path.insert(0, str(ROOT))
+import rag_single
 
 app = Flask(__name__)
 CORS(app)  # <-- This allows requests from Chrome extension
 
+# Load the corpus + TF-IDF once at startup; every request reuses it
+rag_single._get_corpus()
+
 @app.route("/check_job", methods=["POST"])
 def check_job():
     data = request.json
     job_text = data.get("text", "")
     try:
-        with open("temp_job.txt", "w", encoding="utf-8") as f:
-            f.write(job_text)
-        
-        result = subprocess.run(
-            ["python3", "../rag_single.py", "--file", "temp_job.txt"],
-            capture_output=True,
-            text=True
-        )
-        return jsonify({"output": result.stdout})
+        output = rag_single.evaluate(job_text)
+        return jsonify({"output": output})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 if __name__ == "__main__":
-    app.run(host="127.0.0.1", port=5000)
+    # For concurrent requests sharing the one in-process corpus:
+    #   gunicorn -w 1 --threads 8 --chdir extension server:app
+    app.run(host="127.0.0.1", port=5000, threaded=True)
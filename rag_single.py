@@ -2,21 +2,35 @@
 # rag_single_llm_simple.py — minimal LLM-backed RAG (Mistral via Ollama)
 # Pipeline:
 #   1) Load ./data/*.txt → chunk w/ overlap
-#   2) TF-IDF (1–2 grams) → cosine retrieve top-k
+#   2) TF-IDF (1–2 grams, cached on disk) → cosine retrieve top-k
+#      (or sentence embeddings + FAISS with RAG_RETRIEVER=faiss, or GPU scoring with RAG_RETRIEVER=gpu)
 #   3) Tag sources (RED/GREEN/FAKE-EX/REAL-EX/OTHER)
 #   4) Prompt Mistral with short hints + top-k context + job post
 #   5) Print: Verdict + short human-explainable Reasons (1–3 bullets)
 
-import sys, os, re, glob, subprocess, json
+import sys, os, re, json, hashlib, mmap, tempfile, threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import joblib
+import numpy as np
+import requests
+import scipy.sparse as sp
+from requests.adapters import HTTPAdapter
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import make_pipeline
 
 # ---- Config (override with env) ----
 DATA_DIR        = Path(os.environ.get("RAG_DATA_DIR", "data"))
+CACHE_DIR       = Path(os.environ.get("RAG_CACHE_DIR", ".cache"))  # fitted corpus/TF-IDF, keyed by data mtimes
+VECTORIZER      = os.environ.get("RAG_VECTORIZER", "tfidf").lower()  # tfidf | hashing (no vocabulary to build or store)
+RETRIEVER       = os.environ.get("RAG_RETRIEVER", "tfidf").lower()  # tfidf | faiss (needs sentence-transformers + faiss) | gpu (tfidf on cupy)
+EMBED_MODEL     = os.environ.get("RAG_EMBED_MODEL", "all-MiniLM-L6-v2")
 MODEL           = os.environ.get("RAG_MODEL", "mistral:7b")   # ensure: `ollama pull mistral:7b`
+OLLAMA_URL      = os.environ.get("OLLAMA_URL", "http://localhost:11434")
 TOP_K           = int(os.environ.get("RAG_TOPK", "3"))
 CHUNK_SIZE      = int(os.environ.get("RAG_CHUNK", "550"))
 CHUNK_OVERLAP   = int(os.environ.get("RAG_OVERLAP", "120"))
@@ -24,38 +38,226 @@ MAX_JOB_CHARS   = int(os.environ.get("RAG_JOB_CHARS", "1800"))
 MAX_CTX_CHARS   = int(os.environ.get("RAG_CTX_CHARS", "2800"))
 OLLAMA_TIMEOUT  = int(os.environ.get("RAG_OLLAMA_TIMEOUT", "180"))  # first call can be slow
 RETRY_WARMUP    = int(os.environ.get("RAG_RETRY_WARMUP", "1"))      # 1 = one warmup retry
+KEEP_ALIVE      = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")        # keep weights resident between calls
+NUM_PARALLEL    = max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL", "4")))  # concurrent generations (Ollama's 0 = auto → 1)
+NUM_PREDICT     = int(os.environ.get("RAG_NUM_PREDICT", "160"))     # verdict + 3 short bullets fit easily
+MMAP_MIN_BYTES  = 64 * 1024                                         # below this a plain read beats mmap setup
+
+# Stop as soon as the model starts echoing prompt sections instead of running to NUM_PREDICT
+RAG_STOP = ["\n\nJOB POSTING:", "\n\nCONTEXT:", "\n---"]
+
+# ---- Patterns (compiled once at import) ----
+_RE_WS          = re.compile(r"\s+")
+_RE_URL_EMAIL   = re.compile(r"https?://\S+|www\.\S+|[\w\.-]+@[\w\.-]+")
+# one pass for query cleaning: any run of whitespace / URLs / emails becomes a single space
+_RE_CLEAN       = re.compile(rf"(?:\s|{_RE_URL_EMAIL.pattern})+")
+_RE_MARKUP      = re.compile(r"\*\*|__|</?[^>]+>")  # bold/underline + simple HTML tags
+_RE_VERDICT     = re.compile(r"(?im)^\s*verdict:\s*(real|fake)\b")
+_RE_REASONS_HDR = re.compile(r"(?im)^\s*reasons\s*:\s*$")
+_RE_BULLET      = re.compile(r"^[\-\•]\s*")
+
+# One keep-alive HTTP session to the Ollama server, shared by every call (and thread) in this process.
+# Size its pool so concurrent callers (eval threads, server request threads) each keep a connection.
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max(16, 2 * NUM_PARALLEL)))
 
 # ---- IO helpers ----
 def read_txt(p: Path) -> str:
-    return p.read_text(encoding="utf-8", errors="ignore")
+    with open(p, "rb") as f:
+        n = os.fstat(f.fileno()).st_size
+        if n < MMAP_MIN_BYTES:
+            return f.read().decode("utf-8", "ignore")
+        # large files: decode straight from the page cache instead of copying through a read buffer first
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, "utf-8", "ignore")
+
+def iter_chunks(text: str, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP) -> Iterator[str]:
+    """Overlapping windows over the whitespace-normalized text, produced lazily."""
+    text = _RE_WS.sub(" ", (text or "")).strip()
+    step = max(1, size - overlap)
+    # a window starting within the overlap of the end would only repeat the previous window's tail
+    stop = max(len(text) - (size - step), 1) if text else 0
+    for i in range(0, stop, step):
+        yield text[i:i+size]
 
 def chunk_text(text: str, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP) -> List[str]:
-    text = re.sub(r"\s+", " ", (text or "")).strip()
-    if not text:
+    return list(iter_chunks(text, size, overlap))
+
+def corpus_files() -> List[os.DirEntry]:
+    """DATA_DIR/*.txt sorted by name: one scandir, and each entry caches its own stat() for the cache key."""
+    try:
+        with os.scandir(DATA_DIR) as it:
+            return sorted((e for e in it if e.name.endswith(".txt") and e.is_file()), key=lambda e: e.name)
+    except FileNotFoundError:
         return []
-    out, i = [], 0
-    step = max(1, size - overlap)
-    while i < len(text):
-        out.append(text[i:i+size])
-        i += step
-    return out
-
-def load_docs() -> List[Tuple[str, str]]:
-    docs = []
-    for fp in sorted(glob.glob(str(DATA_DIR / "*.txt"))):
-        t = read_txt(Path(fp)).strip()
-        if t:
-            docs.append((Path(fp).name, t))
-    return docs
+
+def load_docs(files: Optional[List[os.DirEntry]] = None) -> List[Tuple[str, str]]:
+    files = corpus_files() if files is None else files
+    if not files:
+        return []
+    # many small files: overlap the open/read syscalls (the GIL is released during I/O)
+    with ThreadPoolExecutor(max_workers=min(16, len(files))) as ex:
+        texts = [t.strip() for t in ex.map(read_txt, files)]
+    return [(fp.name, t) for fp, t in zip(files, texts) if t]
 
 def build_corpus(docs: List[Tuple[str, str]]):
     passages, metas = [], []
     for name, txt in docs:
-        for idx, ch in enumerate(chunk_text(txt)):
-            passages.append(ch)
-            metas.append(f"{name}#chunk{idx}")
+        # chunks stream straight into the corpus list; no per-document list in between
+        start = len(passages)
+        passages.extend(iter_chunks(txt))
+        metas.extend(f"{name}#chunk{idx}" for idx in range(len(passages) - start))
     return passages, metas
 
+def fit_index(passages: List[str]):
+    """Fit TF-IDF on the corpus passages only; queries are transformed against it later."""
+    # float32 halves the matrix scanned per query; cosine ranking doesn't need double precision.
+    # norm="l2" is what lets retrieval score with a bare Q @ XT product instead of cosine_similarity.
+    if VECTORIZER == "hashing":
+        # stateless token → column hashing: only the IDF weights are fitted (no max_df pruning in this mode)
+        vec = make_pipeline(
+            HashingVectorizer(stop_words="english", ngram_range=(1,2), n_features=1 << 18, alternate_sign=False,
+                              norm=None, dtype=np.float32),
+            TfidfTransformer(sublinear_tf=True, norm="l2"),
+        )
+    else:
+        vec = TfidfVectorizer(stop_words="english", ngram_range=(1,2), sublinear_tf=True, min_df=1, max_df=0.98,
+                              norm="l2", dtype=np.float32)
+    X = vec.fit_transform(passages)
+    return vec, X
+
+_CACHE_FORMAT = 5  # bump when the cached corpus tuple (or what fit_index produces) changes
+
+def _corpus_key(files: List[os.DirEntry]) -> str:
+    """Fingerprint of the data files + vectorizer/chunking config; changes whenever the corpus would."""
+    parts = [f"v{_CACHE_FORMAT}:{VECTORIZER}:{CHUNK_SIZE}:{CHUNK_OVERLAP}".encode()]
+    for p in files:
+        st = p.stat()
+        parts.append(f"{p.name}:{st.st_mtime_ns}:{st.st_size}".encode())
+    return hashlib.sha1(b"|".join(parts)).hexdigest()
+
+def _build_corpus_index(files: List[os.DirEntry]):
+    docs = load_docs(files)
+    passages, metas = build_corpus(docs) if docs else ([], [])
+    tags = [source_tag(m.split("#", 1)[0]) for m in metas]  # per-passage RED/GREEN/... tag, computed once
+    vec, X = fit_index(passages) if passages else (None, None)
+    # stored term-major (terms x passages, CSR) so a query scores as Q @ XT with no per-call transpose
+    XT = X.T.tocsr() if X is not None else None
+    return passages, metas, tags, vec, XT
+
+def _corpus_cache_path(key: str) -> Path:
+    return CACHE_DIR / f"rag_corpus_{key}.joblib"
+
+def build_index(files: Optional[List[os.DirEntry]] = None):
+    """Rebuild (passages, metas, tags, vec, XT) from DATA_DIR and save it to CACHE_DIR (`--build-index`)."""
+    files = corpus_files() if files is None else files
+    path = _corpus_cache_path(_corpus_key(files))
+    corpus = _build_corpus_index(files)
+    tmp = None
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # unique temp name: concurrent builders (threads or processes) never write into the same file
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, prefix=path.stem + ".", suffix=".tmp")
+        os.close(fd)
+        joblib.dump(corpus, tmp, compress=0)
+        os.replace(tmp, path)
+        _prune_cache("rag_corpus_*.joblib", keep=path)
+    except OSError:
+        if tmp:
+            Path(tmp).unlink(missing_ok=True)
+        # cache is best-effort (e.g. read-only checkout)
+    return corpus
+
+def _get_corpus():
+    """(passages, metas, tags, vec, XT) for the current data files (see _load_corpus)."""
+    files = corpus_files()
+    return _load_corpus(_corpus_key(files), files)
+
+# In-process memo for _load_corpus: (key, corpus) of the last corpus loaded, guarded so concurrent misses
+# (threaded Flask servers, eval threads) load or build it once.
+_corpus_lock = threading.Lock()
+_corpus_memo: Tuple[Optional[str], Optional[tuple]] = (None, None)
+
+def _load_corpus(key: str, files: Optional[List[os.DirEntry]] = None):
+    """
+    Corpus for data fingerprint `key`, memoized in-process: a long-running caller (server, eval threads)
+    pays one scandir per query and reloads only when the data changes. On a miss it is loaded from
+    CACHE_DIR when present, else rebuilt from `files` (the entries `key` was computed from) and saved.
+    """
+    global _corpus_memo
+    with _corpus_lock:
+        if _corpus_memo[0] != key:
+            _corpus_memo = (key, _read_or_build_corpus(key, files))
+        return _corpus_memo[1]
+
+def _read_or_build_corpus(key: str, files: Optional[List[os.DirEntry]]):
+    path = _corpus_cache_path(key)
+    if path.exists():
+        try:
+            return joblib.load(path, mmap_mode="r")
+        except Exception:
+            pass  # unreadable/stale format → rebuild below
+    return build_index(files)
+
+def _prune_cache(pattern: str, keep: Path):
+    for old in CACHE_DIR.glob(pattern):
+        if old != keep:
+            old.unlink(missing_ok=True)
+
+# ---- Optional embedding retriever (RAG_RETRIEVER=faiss) ----
+@lru_cache(maxsize=1)
+def _get_encoder():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBED_MODEL)
+
+def _embed(texts: List[str]) -> np.ndarray:
+    import faiss
+    emb = np.ascontiguousarray(_get_encoder().encode(texts), dtype=np.float32)
+    faiss.normalize_L2(emb)
+    return emb
+
+def build_faiss_index(passages: List[str], nlist=64, m=48, nbits=8):
+    """
+    Inner-product index over normalized embeddings (= cosine).
+    IVF-PQ once the corpus is big enough to train it (~39 points per centroid); exact flat search below that.
+    """
+    import faiss
+    emb = _embed(passages)
+    d = emb.shape[1]
+    if len(passages) < 39 * max(nlist, 1 << nbits) or d % m:
+        index = faiss.IndexFlatIP(d)
+    else:
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFPQ(quantizer, d, nlist, m, nbits, faiss.METRIC_INNER_PRODUCT)
+        index.train(emb)
+        index.nprobe = 8
+    index.add(emb)
+    return index
+
+@lru_cache(maxsize=1)
+def _get_faiss_index(key: str):
+    """FAISS index over the passages of corpus `key`, persisted next to the TF-IDF cache."""
+    import faiss
+    path = CACHE_DIR / f"rag_faiss_{key}_{EMBED_MODEL.replace('/', '_')}.index"
+    if path.exists():
+        try:
+            return faiss.read_index(str(path))
+        except RuntimeError:
+            pass
+    passages = _load_corpus(key)[0]
+    index = build_faiss_index(passages)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(index, str(path))
+        _prune_cache("rag_faiss_*.index", keep=path)
+    except (OSError, RuntimeError):
+        pass
+    return index
+
+def retrieve_faiss(index, query: str, top_k=TOP_K) -> List[int]:
+    _, ids = index.search(_embed([query]), top_k)
+    return [int(i) for i in ids[0] if i >= 0]
+
 def source_tag(filename: str) -> str:
     f = filename.lower()
     if "redflags" in f:               return "RED"
@@ -64,12 +266,77 @@ def source_tag(filename: str) -> str:
     if "real_job_exemplars" in f:     return "REAL-EX"
     return "OTHER"
 
-def retrieve(passages: List[str], query: str, top_k=TOP_K) -> List[int]:
-    vec = TfidfVectorizer(stop_words="english", ngram_range=(1,2), sublinear_tf=True, min_df=1, max_df=0.98)
-    X = vec.fit_transform(passages + [query])
-    sims = cosine_similarity(X[-1], X[:-1]).flatten()
-    order = sims.argsort()[::-1][:top_k]
-    return order.tolist()
+@lru_cache(maxsize=1)
+def _query_weights(vec):
+    """(analyzer, vocabulary, float32 idf) of a fitted TfidfVectorizer, pulled out once per corpus."""
+    return vec.build_analyzer(), vec.vocabulary_, vec.idf_.astype(np.float32)
+
+def transform_queries(vec, queries: List[str]):
+    """
+    vec.transform(queries) for the default TfidfVectorizer without sklearn's per-call validation/dispatch:
+    same analyzer (stop words, 1–2 grams) → vocab counts → 1+log tf × idf → L2 norm, as one CSR.
+    """
+    if not isinstance(vec, TfidfVectorizer):
+        return vec.transform(queries)  # hashing pipeline: no vocabulary to look up
+    analyze, vocab, idf = _query_weights(vec)
+    indptr, indices, data = [0], [np.empty(0, np.int32)], [np.empty(0, np.float32)]
+    for q in queries:
+        counts = Counter(vocab[t] for t in analyze(q) if t in vocab)
+        cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        w = (np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts))) + 1) * idf[cols]
+        n = np.linalg.norm(w)
+        if n:
+            w /= n
+        indices.append(cols); data.append(w); indptr.append(indptr[-1] + len(cols))
+    return sp.csr_matrix((np.concatenate(data), np.concatenate(indices), indptr), shape=(len(queries), len(idf)))
+
+def retrieve_many(vec, XT, queries: List[str], top_k=TOP_K) -> List[List[int]]:
+    """Top-k passage indices for each query, scored with one stacked sparse product against XT (terms x passages)."""
+    Q = transform_queries(vec, queries)
+    # TF-IDF rows are already L2-normalized, so Q · X^T is the cosine; CSR @ CSR only touches the query's terms
+    sims = (Q @ XT).toarray()
+    k = min(top_k, sims.shape[1])
+    if k <= 0:
+        return [[] for _ in queries]
+    idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(sims, idx, axis=1), axis=1)
+    return np.take_along_axis(idx, order, axis=1).tolist()
+
+def retrieve(vec, XT, query: str, top_k=TOP_K) -> List[int]:
+    return retrieve_many(vec, XT, [query], top_k)[0]
+
+# ---- Optional GPU scoring of the TF-IDF index (RAG_RETRIEVER=gpu, needs cupy + CUDA) ----
+@lru_cache(maxsize=1)
+def _get_gpu_matrix(key: str):
+    """XT of corpus `key` copied to the GPU once, or None when cupy/CUDA isn't usable (→ CPU scoring)."""
+    try:
+        import cupyx.scipy.sparse as cusp
+        XT = _load_corpus(key)[4]
+        return cusp.csr_matrix(XT) if XT is not None else None
+    except Exception:
+        return None
+
+def retrieve_many_gpu(vec, XT_gpu, queries: List[str], top_k=TOP_K) -> List[List[int]]:
+    """retrieve_many with the sparse product and top-k on the GPU; queries are still vectorized on the CPU."""
+    import cupy as cp
+    import cupyx.scipy.sparse as cusp
+    sims = (cusp.csr_matrix(transform_queries(vec, queries)) @ XT_gpu).toarray()
+    k = min(top_k, sims.shape[1])
+    if k <= 0:
+        return [[] for _ in queries]
+    idx = cp.argpartition(-sims, k - 1, axis=1)[:, :k]
+    order = cp.argsort(-cp.take_along_axis(sims, idx, axis=1), axis=1)
+    return cp.asnumpy(cp.take_along_axis(idx, order, axis=1)).tolist()
+
+# Fixed instructions, sent as the system prompt so every request starts with the same tokens
+# and Ollama can reuse their KV cache instead of re-running prefill on them.
+RAG_SYSTEM = """You are classifying a job posting as Real or Fake.
+Use the CONTEXT blocks (tagged RED/GREEN/FAKE-EX/REAL-EX/OTHER) to inform your reasoning.
+If many RED/FAKE-EX chunks appear, lean toward Fake. If many GREEN/REAL-EX chunks appear, lean toward Real.
+However, prefer direct evidence from the JOB POSTING when available.
+
+OUTPUT FORMAT (JSON only, exactly these keys):
+{"verdict": "Real" or "Fake", "reasons": ["reason #1 (quote tiny snippet from CONTEXT or JOB POSTING if useful)", "reason #2 (optional)", "reason #3 (optional)"]}"""
 
 def make_prompt(context_blocks: List[Tuple[str, str]], job_text: str) -> str:
     """
@@ -97,12 +364,7 @@ def make_prompt(context_blocks: List[Tuple[str, str]], job_text: str) -> str:
     if len(context_joined) > MAX_CTX_CHARS:
         context_joined = context_joined[:MAX_CTX_CHARS]
 
-    return f"""You are classifying a job posting as Real or Fake.
-Use the CONTEXT blocks (tagged RED/GREEN/FAKE-EX/REAL-EX/OTHER) to inform your reasoning.
-If many RED/FAKE-EX chunks appear, lean toward Fake. If many GREEN/REAL-EX chunks appear, lean toward Real.
-However, prefer direct evidence from the JOB POSTING when available.
-
-GUIDANCE:
+    return f"""GUIDANCE:
 {chr(10).join(hint_lines)}
 
 CONTEXT:
@@ -110,77 +372,232 @@ CONTEXT:
 
 JOB POSTING:
 {job_text}
-
-OUTPUT FORMAT (exactly):
-Verdict: Real|Fake
-Reasons:
-- reason #1 (quote tiny snippet from CONTEXT or JOB POSTING if useful)
-- reason #2 (optional)
-- reason #3 (optional)
 """.strip()
 
+def _ctx_size() -> int:
+    """
+    One num_ctx for every call and the warmup: Ollama reloads the model whenever num_ctx changes between
+    requests. Power of two (>= 2048) that fits the largest RAG prompt — system + guidance/headers +
+    MAX_CTX_CHARS + MAX_JOB_CHARS at ~3 chars/token — plus the answer. RAG_NUM_CTX overrides it.
+    """
+    est_tokens = (len(RAG_SYSTEM) + 400 + MAX_CTX_CHARS + MAX_JOB_CHARS) // 3 + NUM_PREDICT
+    return int(os.environ.get("RAG_NUM_CTX", "0")) or 1 << max(11, est_tokens.bit_length())
+
+NUM_CTX = _ctx_size()
+
+def _generate_body(prompt: str, model: str, num_predict: int, stop, system: Optional[str], stream: bool,
+                   json_mode: bool = False) -> dict:
+    """JSON body for a greedy /api/generate call."""
+    options = {
+        "temperature": 0, "top_k": 1, "top_p": 1,
+        "num_ctx": NUM_CTX, "num_predict": num_predict,  # only the answer budget varies per call
+    }
+    if stop:
+        options["stop"] = stop
+    body = {"model": model, "prompt": prompt, "stream": stream, "keep_alive": KEEP_ALIVE, "options": options}
+    if system:
+        body["system"] = system
+    if json_mode:
+        body["format"] = "json"  # constrained decoding: the answer is always parseable JSON
+    return body
+
+def ollama_generate(prompt: str, model=MODEL, timeout=OLLAMA_TIMEOUT, num_predict=NUM_PREDICT, stop=None,
+                    system: Optional[str] = None, json_mode: bool = False) -> str:
+    """Single non-streaming, greedy call to Ollama's /api/generate over the shared session."""
+    r = SESSION.post(
+        f"{OLLAMA_URL}/api/generate",
+        json=_generate_body(prompt, model, num_predict, stop, system, stream=False, json_mode=json_mode),
+        timeout=timeout,
+    )
+    r.raise_for_status()
+    return r.json().get("response", "")
+
+def ollama_stream(prompt: str, model=MODEL, timeout=OLLAMA_TIMEOUT, num_predict=NUM_PREDICT, stop=None,
+                  system: Optional[str] = None, json_mode: bool = False):
+    """Streaming variant of ollama_generate: yields response fragments as Ollama produces them.
+
+    Closing the generator early drops the connection, which makes Ollama stop generating.
+    """
+    with SESSION.post(
+        f"{OLLAMA_URL}/api/generate",
+        json=_generate_body(prompt, model, num_predict, stop, system, stream=True, json_mode=json_mode),
+        timeout=timeout,
+        stream=True,
+    ) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
+
+def _parse_answer(text: str) -> Optional[dict]:
+    """The {"verdict": ..., "reasons": [...]} object in a JSON-mode answer, or None if it isn't complete/valid."""
+    i, j = text.find("{"), text.rfind("}")
+    if i < 0 or j < i:
+        return None
+    try:
+        obj = json.loads(text[i:j+1])
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+def ollama_warmup(model=MODEL, timeout=OLLAMA_TIMEOUT) -> bool:
+    """Load `model` into memory (empty prompt, no generation) and pin it for KEEP_ALIVE."""
+    try:
+        r = SESSION.post(
+            f"{OLLAMA_URL}/api/generate",
+            json={"model": model, "keep_alive": KEEP_ALIVE, "options": {"num_ctx": NUM_CTX}},  # load at the size calls use
+            timeout=timeout,
+        )
+        return r.ok
+    except requests.RequestException:
+        return False
+
 def ollama_run(prompt: str, model=MODEL, timeout=OLLAMA_TIMEOUT) -> str:
-    """Call Mistral via Ollama CLI with optional warmup retry."""
-    cmd = ["ollama", "run", model]
+    """Call Mistral via the streaming Ollama HTTP API with optional warmup retry."""
     tries = 1 + max(0, RETRY_WARMUP)
     last_err = ""
     for t in range(tries):
         try:
-            res = subprocess.run(
-                cmd, input=prompt, text=True, capture_output=True, timeout=timeout
-            )
-            out = (res.stdout or "").strip()
+            parts = []
+            stream = ollama_stream(prompt, model, timeout, stop=RAG_STOP, system=RAG_SYSTEM, json_mode=True)
+            for piece in stream:
+                parts.append(piece)
+                # JSON mode can pad with whitespace after the object: stop as soon as it closes
+                if "}" in piece and _parse_answer("".join(parts)) is not None:
+                    break
+            out = "".join(parts).strip()
             if out:
                 return out
-            last_err = (res.stderr or "").strip()
-        except subprocess.TimeoutExpired:
+            last_err = "empty response"
+        except requests.Timeout:
             last_err = f"timeout after {timeout}s"
+        except requests.RequestException as e:
+            last_err = str(e)
         # warmup ping before retry (load model)
-        try:
-            subprocess.run(["ollama", "run", model, "ok"], text=True, capture_output=True, timeout=30)
-        except Exception:
-            pass
+        ollama_warmup(model, timeout=30)
     return f"Verdict: Fake\nReasons:\n- The model did not respond in time ({last_err})."
 
-def parse_and_print(raw: str):
-    """Normalize model output → print Verdict + Reasons bullets (1–3)."""
+def format_output(raw: str) -> str:
+    """Normalize model output → Verdict + Reasons bullets (1–3) as one string."""
     t = (raw or "").strip()
-    t = re.sub(r"\*\*|__", "", t)
-    t = re.sub(r"</?[^>]+>", "", t)
-
-    m = re.search(r"(?im)^\s*verdict:\s*(real|fake)\b", t)
-    verdict = m.group(1).capitalize() if m else None
-
-    reasons = []
-    # capture lines under "Reasons:" that look like bullets
-    block = re.split(r"(?im)^\s*reasons\s*:\s*$", t)
-    if len(block) > 1:
-        for line in block[1].splitlines():
-            ls = line.strip()
-            if ls.startswith("-") or ls.startswith("•"):
-                reasons.append(re.sub(r"^[\-\•]\s*", "- ", ls))
-            elif ls and len(reasons) > 0:
-                # stop at first non-bullet after starting bullets
-                break
+    obj = _parse_answer(t)
+    if obj is not None:
+        # JSON-mode answer: one C-level parse, no regex passes
+        v = str(obj.get("verdict", "")).strip().capitalize()
+        verdict = v if v in ("Real", "Fake") else None
+        rs = obj.get("reasons")
+        rs = [rs] if isinstance(rs, str) else (rs if isinstance(rs, list) else [])
+        reasons = [f"- {r.strip()}" for r in rs if isinstance(r, str) and r.strip()]
+    else:
+        # plain-text answer (or our own timeout message)
+        t = _RE_MARKUP.sub("", t)
+
+        m = _RE_VERDICT.search(t)
+        verdict = m.group(1).capitalize() if m else None
+
+        reasons = []
+        # capture lines under "Reasons:" that look like bullets
+        block = _RE_REASONS_HDR.split(t)
+        if len(block) > 1:
+            for line in block[1].splitlines():
+                ls = line.strip()
+                if ls.startswith("-") or ls.startswith("•"):
+                    reasons.append(_RE_BULLET.sub("- ", ls))
+                elif ls and len(reasons) > 0:
+                    # stop at first non-bullet after starting bullets
+                    break
 
     if not verdict:
-        # fallback: nudge based on the word presence, but keep it rare
+        # fallback: whichever word the model used more often (ties → Real), but keep it rare
         low = t.lower()
-        verdict = "Fake" if ("fake" in low and "real" not in low) else "Real"
+        verdict = "Fake" if low.count("fake") > low.count("real") else "Real"
 
     if not reasons:
         reasons = ["- The wording aligns more with this category given the retrieved context and job details."]
 
-    print(f"Verdict: {verdict}")
-    print("Reasons:")
-    for r in reasons[:3]:
-        print(r)
+    return "\n".join([f"Verdict: {verdict}", "Reasons:"] + reasons[:3])
+
+def parse_and_print(raw: str):
+    """Normalize model output → print Verdict + Reasons bullets (1–3)."""
+    print(format_output(raw))
+
+_EMPTY_POSTING = "Verdict: Fake\nReasons:\n- The posting is empty; there is no information to evaluate."
+
+def _clean_query(job_text: str) -> str:
+    """Clean & trim a posting into the retrieval query / prompt text."""
+    return _RE_CLEAN.sub(' ', job_text or "").strip()[:MAX_JOB_CHARS]
+
+def _retrieve_blocks(queries: List[str]) -> List[List[Tuple[str, str]]]:
+    """Retrieved (source tag, passage) context blocks for each query."""
+    # Build corpus (cached in-process per data fingerprint, and on disk)
+    files = corpus_files()
+    key = _corpus_key(files)
+    passages, metas, tags, vec, XT = _load_corpus(key, files)
+    if not passages:
+        # no context; still let Mistral decide just from post
+        return [[] for _ in queries]
+    if RETRIEVER == "faiss":
+        index = _get_faiss_index(key)
+        hits = [retrieve_faiss(index, q, top_k=TOP_K) for q in queries]
+    elif RETRIEVER == "gpu" and _get_gpu_matrix(key) is not None:
+        hits = retrieve_many_gpu(vec, _get_gpu_matrix(key), queries, top_k=TOP_K)
+    else:
+        hits = retrieve_many(vec, XT, queries, top_k=TOP_K)
+    return [[(tags[i], passages[i]) for i in idxs] for idxs in hits]
+
+def evaluate(job_text: str) -> str:
+    """Run the full RAG pipeline on one posting and return the formatted Verdict/Reasons text."""
+    q = _clean_query(job_text)
+    if not q:
+        return _EMPTY_POSTING
+    prompt = make_prompt(_retrieve_blocks([q])[0], q)
+    raw = ollama_run(prompt, MODEL)
+    return format_output(raw)
+
+def evaluate_many(job_texts: List[str]) -> List[str]:
+    """evaluate() over a batch: one retrieval pass for all postings, up to NUM_PARALLEL generations in flight."""
+    queries = [_clean_query(t) for t in job_texts]
+    live = [i for i, q in enumerate(queries) if q]
+    outputs = [_EMPTY_POSTING] * len(queries)
+    if not live:
+        return outputs
+    blocks = _retrieve_blocks([queries[i] for i in live])
+    prompts = [make_prompt(b, queries[i]) for i, b in zip(live, blocks)]
+    with ThreadPoolExecutor(max_workers=NUM_PARALLEL) as ex:
+        for i, raw in zip(live, ex.map(ollama_run, prompts)):
+            outputs[i] = format_output(raw)
+    return outputs
+
+def classify(job_text: str) -> Tuple[int, str]:
+    """Library entry point: (label, text) with label 0=Real, 1=Fake."""
+    out = evaluate(job_text)
+    return (1 if out.startswith("Verdict: Fake") else 0), out
 
 # ---- Main ----
 def main():
-    # Input: --text "...", --file path, or stdin
+    # Input: --text "...", --file path, or stdin  (--build-index: refresh the corpus cache and exit;
+    # --batch postings.jsonl: evaluate many postings in one process, one JSON result per line)
     args = sys.argv[1:]
     job_text = ""
+    if "--build-index" in args:
+        passages, metas = build_index()[:2]
+        print(f"Indexed {len(passages)} chunks from {len({m.split('#', 1)[0] for m in metas})} files into {CACHE_DIR}/")
+        return
+    if "--batch" in args:
+        # JSONL in (one posting per line: a JSON string or {"text": ...}), JSONL out ({"output": ...})
+        i = args.index("--batch")
+        src = open(args[i+1], encoding="utf-8") if i+1 < len(args) and args[i+1] != "-" else sys.stdin
+        with src:
+            rows = [json.loads(line) for line in src if line.strip()]
+        texts = [r if isinstance(r, str) else r.get("text", "") for r in rows]
+        for out in evaluate_many(texts):
+            print(json.dumps({"output": out}, ensure_ascii=False))
+        return
     if "--text" in args:
         i = args.index("--text"); 
         if i+1 < len(args): job_text = args[i+1]
@@ -190,32 +607,7 @@ def main():
     else:
         job_text = sys.stdin.read()
 
-    # Clean & trim the job text
-    job_text = (job_text or "")
-    q = re.sub(r'https?://\S+|www\.\S+|[\w\.-]+@[\w\.-]+', ' ', job_text)
-    q = re.sub(r'\s+', ' ', q).strip()[:MAX_JOB_CHARS]
-    if not q:
-        print("Verdict: Fake")
-        print("Reasons:\n- The posting is empty; there is no information to evaluate.")
-        return
-
-    # Build corpus
-    docs = load_docs()
-    passages, metas = build_corpus(docs) if docs else ([], [])
-    if passages:
-        idxs = retrieve(passages, q, top_k=TOP_K)
-        blocks = []
-        for i in idxs:
-            fname = metas[i].split("#", 1)[0]
-            tag = source_tag(fname)
-            blocks.append((tag, passages[i]))
-    else:
-        # no context; still let Mistral decide just from post
-        blocks = []
-
-    prompt = make_prompt(blocks, q)
-    raw = ollama_run(prompt, MODEL)
-    parse_and_print(raw)
+    print(evaluate(job_text))
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,79 @@ import faiss
 import re
 import time
 
+try:
+    import ahocorasick  # optional: pip install pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Keyword tables for the rule-based red flags, compiled once at import: one escaped
+# alternation per flag answers "does any of this flag's keywords occur?" in a single search
+DETAILED_RED_FLAG_KEYWORDS = {
+    'sensitive_info_request': ['ssn', 'social security', 'bank details', 'bank account', 'routing number'],
+    'unrealistic_salary': ['$5000', '$8000', '$10000', '$12000', '$15000', 'high salary', 'earn much'],
+    'personal_contact': ['@gmail.com', '@yahoo.com', '@hotmail.com', 'personal email'],
+    'urgency_tactics': ['immediately', 'urgent', 'quick start', 'asap', 'right away', 'instant'],
+    'upfront_payment': ['payment', 'fee', 'deposit', 'background check fee', 'training materials'],
+    'no_qualifications': ['no experience', 'no skills', 'no background', 'no degree', 'no certification'],
+    'pyramid_scheme': ['recruit', 'multi-level', 'mlm', 'pyramid', 'downline'],
+    'vague_company': ['established company', 'successful business', 'leading firm', 'premier organization'],
+    'work_from_home_scam': ['work from home', 'remote work', 'home based', 'telecommute']
+}
+DETAILED_RED_FLAG_PATTERNS = {
+    flag_name: re.compile('|'.join(map(re.escape, keywords)))
+    for flag_name, keywords in DETAILED_RED_FLAG_KEYWORDS.items()
+}
+
+TEXT_RED_FLAG_KEYWORDS = {
+    'sensitive_info_request': ['ssn', 'social security', 'bank details', 'bank account'],
+    'unrealistic_salary': ['$5000', '$8000', '$10000', '$12000', '$15000'],
+    'personal_contact': ['@gmail.com', '@yahoo.com', '@hotmail.com'],
+    'urgency_tactics': ['immediately', 'urgent', 'quick start', 'asap'],
+    'upfront_payment': ['payment', 'fee', 'deposit', 'training materials'],
+    'no_qualifications': ['no experience', 'no skills', 'no background']
+}
+TEXT_RED_FLAG_PATTERNS = {
+    flag_name: re.compile('|'.join(map(re.escape, keywords)))
+    for flag_name, keywords in TEXT_RED_FLAG_KEYWORDS.items()
+}
+
+# Plain-phrase watchlists for the knowledge-base text: one Aho-Corasick pass over the text finds
+# every phrase at once (falls back to substring tests without pyahocorasick)
+SCAM_INDICATORS = [
+    'ssn', 'social security', 'bank details', 'routing number',
+    'immediately', 'urgent', 'quick start', 'asap',
+    'no experience', 'no skills', 'no background',
+    'earn much', 'get rich', 'high salary', '$5000', '$8000', '$10000',
+    'personal email', '@gmail', '@yahoo', '@hotmail',
+    'payment', 'fee', 'deposit', 'training materials'
+]
+SUSPICIOUS_ELEMENT_TERMS = {
+    'sensitive_info_request': ['ssn', 'social security', 'bank details'],
+    'unrealistic_compensation': ['$5000', '$8000', '$10000', 'high salary'],
+    'no_qualifications': ['no experience', 'no skills', 'no background'],
+    'urgency_pressure': ['immediately', 'urgent', 'quick start'],
+}
+SUSPICIOUS_KEYWORDS = sorted({term for terms in SUSPICIOUS_ELEMENT_TERMS.values() for term in terms})
+
+def _keyword_automaton(keywords):
+    """Aho-Corasick automaton over keywords, or None when pyahocorasick is not installed"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+def _found_keywords(automaton, keywords, text):
+    """Set of keywords occurring in text: one automaton pass, or substring tests as fallback"""
+    if automaton is not None:
+        return {keyword for _, keyword in automaton.iter(text)}
+    return {keyword for keyword in keywords if keyword in text}
+
+SCAM_INDICATOR_AUTOMATON = _keyword_automaton(SCAM_INDICATORS)
+SUSPICIOUS_AUTOMATON = _keyword_automaton(SUSPICIOUS_KEYWORDS)
+
 class FixedImprovedJobScamRAG:
     def __init__(self, knowledge_base_path='../data/fake_job_postings.csv'):
         print("Loading FIXED IMPROVED RAG system...")
@@ -30,18 +103,20 @@ class FixedImprovedJobScamRAG:
             description = str(row['description'])[:300]
             requirements = str(row.get('requirements', ''))[:200]
             
+            red_flags = self.extract_detailed_red_flags(row)  # same row → same flags for both entries
+            
             # Create multiple specialized entries from each scam
             entries = [
                 {
                     'text': f"SCAM_PATTERN: {title}. Company: {company}. Key phrases: {self.extract_scam_phrases(description)}",
-                    'red_flags': self.extract_detailed_red_flags(row),
+                    'red_flags': red_flags,
                     'source': 'Kaggle Scam Database',
                     'label': 'fake',
                     'confidence_boost': 1.0
                 },
                 {
                     'text': f"SCAM_INDICATORS: {title}. Suspicious elements: {self.get_suspicious_elements(description + requirements)}",
-                    'red_flags': self.extract_detailed_red_flags(row),
+                    'red_flags': list(red_flags),
                     'source': 'Scam Analysis',
                     'label': 'fake', 
                     'confidence_boost': 0.9
@@ -190,37 +265,16 @@ class FixedImprovedJobScamRAG:
     
     def extract_scam_phrases(self, text):
         """Extract key scam indicator phrases"""
-        text_lower = text.lower()
-        scam_phrases = []
-        
-        scam_indicators = [
-            'ssn', 'social security', 'bank details', 'routing number',
-            'immediately', 'urgent', 'quick start', 'asap',
-            'no experience', 'no skills', 'no background',
-            'earn much', 'get rich', 'high salary', '$5000', '$8000', '$10000',
-            'personal email', '@gmail', '@yahoo', '@hotmail',
-            'payment', 'fee', 'deposit', 'training materials'
-        ]
-        
-        for indicator in scam_indicators:
-            if indicator in text_lower:
-                scam_phrases.append(indicator)
+        found = _found_keywords(SCAM_INDICATOR_AUTOMATON, SCAM_INDICATORS, text.lower())
+        scam_phrases = [indicator for indicator in SCAM_INDICATORS if indicator in found]
         
         return ', '.join(scam_phrases[:5])  # Return top 5 phrases
     
     def get_suspicious_elements(self, text):
         """Identify specific suspicious elements"""
-        text_lower = text.lower()
-        elements = []
-        
-        if any(term in text_lower for term in ['ssn', 'social security', 'bank details']):
-            elements.append('sensitive_info_request')
-        if any(term in text_lower for term in ['$5000', '$8000', '$10000', 'high salary']):
-            elements.append('unrealistic_compensation')
-        if any(term in text_lower for term in ['no experience', 'no skills', 'no background']):
-            elements.append('no_qualifications')
-        if any(term in text_lower for term in ['immediately', 'urgent', 'quick start']):
-            elements.append('urgency_pressure')
+        found = _found_keywords(SUSPICIOUS_AUTOMATON, SUSPICIOUS_KEYWORDS, text.lower())
+        elements = [element for element, terms in SUSPICIOUS_ELEMENT_TERMS.items()
+                    if any(term in found for term in terms)]
         
         return ', '.join(elements)
     
@@ -234,21 +288,9 @@ class FixedImprovedJobScamRAG:
         
         full_text = company + ' ' + description + ' ' + requirements
         
-        # Comprehensive red flag detection
-        red_flag_patterns = {
-            'sensitive_info_request': ['ssn', 'social security', 'bank details', 'bank account', 'routing number'],
-            'unrealistic_salary': ['$5000', '$8000', '$10000', '$12000', '$15000', 'high salary', 'earn much'],
-            'personal_contact': ['@gmail.com', '@yahoo.com', '@hotmail.com', 'personal email'],
-            'urgency_tactics': ['immediately', 'urgent', 'quick start', 'asap', 'right away', 'instant'],
-            'upfront_payment': ['payment', 'fee', 'deposit', 'background check fee', 'training materials'],
-            'no_qualifications': ['no experience', 'no skills', 'no background', 'no degree', 'no certification'],
-            'pyramid_scheme': ['recruit', 'multi-level', 'mlm', 'pyramid', 'downline'],
-            'vague_company': ['established company', 'successful business', 'leading firm', 'premier organization'],
-            'work_from_home_scam': ['work from home', 'remote work', 'home based', 'telecommute']
-        }
-        
-        for flag_name, patterns in red_flag_patterns.items():
-            if any(pattern in full_text for pattern in patterns):
+        # Comprehensive red flag detection (one precompiled alternation per flag)
+        for flag_name, pattern in DETAILED_RED_FLAG_PATTERNS.items():
+            if pattern.search(full_text):
                 red_flags.append(flag_name)
         
         return red_flags
@@ -331,17 +373,8 @@ class FixedImprovedJobScamRAG:
         text_lower = text.lower()
         red_flags = []
         
-        red_flag_patterns = {
-            'sensitive_info_request': ['ssn', 'social security', 'bank details', 'bank account'],
-            'unrealistic_salary': ['$5000', '$8000', '$10000', '$12000', '$15000'],
-            'personal_contact': ['@gmail.com', '@yahoo.com', '@hotmail.com'],
-            'urgency_tactics': ['immediately', 'urgent', 'quick start', 'asap'],
-            'upfront_payment': ['payment', 'fee', 'deposit', 'training materials'],
-            'no_qualifications': ['no experience', 'no skills', 'no background']
-        }
-        
-        for flag_name, patterns in red_flag_patterns.items():
-            if any(pattern in text_lower for pattern in patterns):
+        for flag_name, pattern in TEXT_RED_FLAG_PATTERNS.items():
+            if pattern.search(text_lower):
                 red_flags.append(flag_name)
         
         return red_flags
@@ -5,9 +5,24 @@ import io
 import csv
 from datetime import datetime
 import os
+import sys
 import time
-import subprocess
 import re
+import heapq
+from pathlib import Path
+
+try:
+    import ahocorasick  # optional: pip install pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+# rag_single.py and data/ live one level up; run the RAG pipeline in-process so its
+# corpus/TF-IDF index is loaded once and reused by every request
+ROOT = Path(__file__).resolve().parent.parent
+os.environ.setdefault("RAG_DATA_DIR", str(ROOT / "data"))
+os.environ.setdefault("RAG_CACHE_DIR", str(ROOT / ".cache"))
+sys.path.insert(0, str(ROOT))
+import rag_single
 
 app = Flask(__name__)
 # Enable CORS for all routes - this fixes the browser extension issue
@@ -736,29 +751,61 @@ curl -X POST http://localhost:5001/analyze \\
 '''
 
 
+SCAM_PATTERNS = {
+    'sensitive_info_request': ['ssn', 'social security', 'bank details', 'bank account', 'routing number'],
+    'unrealistic_salary': ['$8000', '$10000', '$5000 monthly', '$10000 monthly'],
+    'personal_contact': ['@gmail.com', '@yahoo.com', '@hotmail.com'],
+    'urgency_tactics': ['immediately', 'urgent', 'quick start', 'asap'],
+    'no_qualifications': ['no experience', 'no skills', 'no background'],
+    'upfront_payment': ['payment', 'fee', 'deposit', 'training materials']
+}
+
+LEGIT_INDICATORS = ['bachelor', 'degree', 'experience', 'salary', 'benefits', 'requirements']
+
+def _build_keyword_automaton(entries):
+    """Aho-Corasick automaton over (keyword, value) pairs; each keyword maps to a tuple of its values.
+    Returns None when pyahocorasick is not installed."""
+    if ahocorasick is None:
+        return None
+    values_by_keyword = {}
+    for keyword, value in entries:
+        values_by_keyword.setdefault(keyword, []).append(value)
+    automaton = ahocorasick.Automaton()
+    for keyword, values in values_by_keyword.items():
+        automaton.add_word(keyword, tuple(values))
+    automaton.make_automaton()
+    return automaton
+
+def _scan(automaton, entries, text):
+    """Set of values whose keyword occurs in text: one automaton pass, or substring tests as fallback"""
+    if automaton is not None:
+        return {value for _, values in automaton.iter(text) for value in values}
+    return {value for keyword, value in entries if keyword in text}
+
+SIMPLE_ANALYSIS_KEYWORDS = (
+    [(pattern, ('scam', flag_name)) for flag_name, patterns in SCAM_PATTERNS.items() for pattern in patterns]
+    + [(indicator, ('legit', indicator)) for indicator in LEGIT_INDICATORS]
+)
+KEYWORD_AUTOMATON = _build_keyword_automaton(SIMPLE_ANALYSIS_KEYWORDS)
+
+def _keyword_hits(text):
+    """Return (scam flag names, legit indicators) found in lowercased text"""
+    hits = _scan(KEYWORD_AUTOMATON, SIMPLE_ANALYSIS_KEYWORDS, text)
+    scam_hits = {name for kind, name in hits if kind == 'scam'}
+    legit_hits = {name for kind, name in hits if kind == 'legit'}
+    return scam_hits, legit_hits
+
 def simple_analysis(job_text):
     """Simple pattern matching as fallback"""
     text = job_text.lower()
-    scam_score = 0
-    red_flags = []
-    
-    scam_patterns = {
-        'sensitive_info_request': ['ssn', 'social security', 'bank details', 'bank account', 'routing number'],
-        'unrealistic_salary': ['$8000', '$10000', '$5000 monthly', '$10000 monthly'],
-        'personal_contact': ['@gmail.com', '@yahoo.com', '@hotmail.com'],
-        'urgency_tactics': ['immediately', 'urgent', 'quick start', 'asap'],
-        'no_qualifications': ['no experience', 'no skills', 'no background'],
-        'upfront_payment': ['payment', 'fee', 'deposit', 'training materials']
-    }
-    
-    for flag_name, patterns in scam_patterns.items():
-        if any(pattern in text for pattern in patterns):
-            scam_score += 0.2
-            red_flags.append(flag_name)
+    scam_hits, legit_hits = _keyword_hits(text)
+
+    # Keep the SCAM_PATTERNS order for reporting
+    red_flags = [flag_name for flag_name in SCAM_PATTERNS if flag_name in scam_hits]
+    scam_score = 0.2 * len(red_flags)
     
     # Legitimate indicators
-    legit_indicators = ['bachelor', 'degree', 'experience', 'salary', 'benefits', 'requirements']
-    legit_score = sum(0.05 for indicator in legit_indicators if indicator in text)
+    legit_score = 0.05 * len(legit_hits)
     
     final_score = max(0.1, scam_score - legit_score)
     
@@ -769,6 +816,13 @@ def simple_analysis(job_text):
         'reasoning': f"Simple analysis: {len(red_flags)} red flags detected"
     }
 
+VERDICT_LINE_RE = re.compile(r'(?i)^\s*verdict\s*:\s*(fake|real)')
+VERDICT_WORD_RE = re.compile(r'(?i)(fake|real)')
+REASONS_HDR_RE = re.compile(r'(?i)^\s*reasons?\s*:')
+BULLET_RE = re.compile(r'^[\-\•\*]\s*')
+VERDICT_PREFIX_RE = re.compile(r'(?i)^\s*verdict')
+REASONS_PREFIX_RE = re.compile(r'(?i)^\s*reasons')
+
 def parse_rag_single_output(output):
     """Parse the output from rag_single.py into our standard format"""
     print(f"🔍 Parsing RAG output: {output}")
@@ -787,15 +841,15 @@ def parse_rag_single_output(output):
         line = line.strip()
         
         # Check for verdict (case insensitive, flexible formatting)
-        if re.search(r'(?i)^\s*verdict\s*:\s*(fake|real)', line):
-            verdict_match = re.search(r'(?i)(fake|real)', line)
+        if VERDICT_LINE_RE.search(line):
+            verdict_match = VERDICT_WORD_RE.search(line)
             if verdict_match:
                 verdict_text = verdict_match.group(1).lower()
                 prediction = 'fake' if 'fake' in verdict_text else 'real'
                 print(f"🎯 Detected {prediction.upper()} verdict")
         
         # Check for reasons section
-        elif re.search(r'(?i)^\s*reasons?\s*:', line):
+        elif REASONS_HDR_RE.search(line):
             in_reasons_section = True
             continue
         
@@ -803,7 +857,7 @@ def parse_rag_single_output(output):
         elif in_reasons_section:
             if line and (line.startswith('-') or line.startswith('•') or line.startswith('*')):
                 # Clean the reason line
-                clean_line = re.sub(r'^[\-\•\*]\s*', '', line).strip()
+                clean_line = BULLET_RE.sub('', line).strip()
                 if clean_line and len(clean_line) > 3:  # Only add substantial reasons
                     reasoning_lines.append(clean_line)
                     print(f"📝 Added reason: {clean_line}")
@@ -824,8 +878,8 @@ def parse_rag_single_output(output):
         for line in lines:
             clean_line = line.strip()
             if (clean_line and 
-                not re.search(r'(?i)^\s*verdict', clean_line) and 
-                not re.search(r'(?i)^\s*reasons', clean_line) and
+                not VERDICT_PREFIX_RE.search(clean_line) and 
+                not REASONS_PREFIX_RE.search(clean_line) and
                 len(clean_line) > 10):
                 fallback_reasons.append(clean_line)
         
@@ -860,29 +914,27 @@ def parse_rag_single_output(output):
         'red_flags': red_flags
     }
 
+REASONING_FLAG_PATTERNS = {
+    'sensitive_info_request': ['ssn', 'social security', 'bank', 'personal information', 'sensitive information', 'send ssn'],
+    'unrealistic_salary': ['high salary', 'unrealistic', 'extremely high', 'implausible', '$8000', '$9000', '$10000', 'too good to be true'],
+    'personal_contact': ['gmail', 'yahoo', 'hotmail', 'personal email', '@gmail.com'],
+    'urgency_tactics': ['urgent', 'immediately', 'quick start', 'asap', 'right away'],
+    'no_qualifications': ['no experience', 'no skills', 'no qualifications', 'no background'],
+    'upfront_payment': ['payment', 'fee', 'deposit', 'pay money', 'upfront'],
+    'work_from_home_scam': ['work from home', 'remote work with high pay', 'data entry from home'],
+    'vague_company': ['vague', 'no company', 'missing details', 'fraudulent', 'legitimate company'],
+    'poor_grammar': ['poor grammar', 'spelling errors', 'unprofessional'],
+    'money_transfer': ['money transfer', 'wire transfer', 'western union']
+}
+REASONING_FLAG_KEYWORDS = [
+    (pattern, flag_name) for flag_name, patterns in REASONING_FLAG_PATTERNS.items() for pattern in patterns
+]
+REASONING_FLAG_AUTOMATON = _build_keyword_automaton(REASONING_FLAG_KEYWORDS)
+
 def extract_red_flags_from_reasoning(reasoning):
     """Extract red flags from the reasoning text"""
-    red_flags = []
-    reasoning_lower = reasoning.lower()
-    
-    flag_patterns = {
-        'sensitive_info_request': ['ssn', 'social security', 'bank', 'personal information', 'sensitive information', 'send ssn'],
-        'unrealistic_salary': ['high salary', 'unrealistic', 'extremely high', 'implausible', '$8000', '$9000', '$10000', 'too good to be true'],
-        'personal_contact': ['gmail', 'yahoo', 'hotmail', 'personal email', '@gmail.com'],
-        'urgency_tactics': ['urgent', 'immediately', 'quick start', 'asap', 'right away'],
-        'no_qualifications': ['no experience', 'no skills', 'no qualifications', 'no background'],
-        'upfront_payment': ['payment', 'fee', 'deposit', 'pay money', 'upfront'],
-        'work_from_home_scam': ['work from home', 'remote work with high pay', 'data entry from home'],
-        'vague_company': ['vague', 'no company', 'missing details', 'fraudulent', 'legitimate company'],
-        'poor_grammar': ['poor grammar', 'spelling errors', 'unprofessional'],
-        'money_transfer': ['money transfer', 'wire transfer', 'western union']
-    }
-    
-    for flag_name, patterns in flag_patterns.items():
-        if any(pattern in reasoning_lower for pattern in patterns):
-            red_flags.append(flag_name)
-    
-    return red_flags
+    found = _scan(REASONING_FLAG_AUTOMATON, REASONING_FLAG_KEYWORDS, reasoning.lower())
+    return [flag_name for flag_name in REASONING_FLAG_PATTERNS if flag_name in found]
 
 @app.route('/')
 def home():
@@ -935,44 +987,11 @@ def analyze_job():
         # Use the new RAG single model
         parsed_result = None
         try:
-            # Add the scripts directory to Python path
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            scripts_dir = os.path.join(current_dir, 'scripts')
-            
-            print(f"📁 Current directory: {current_dir}")
-            print(f"📁 Scripts directory: {scripts_dir}")
-            
-            rag_script_path = os.path.join(scripts_dir, 'rag_single.py')
-            print(f"📄 RAG script path: {rag_script_path}")
-            print(f"✅ Script exists: {os.path.exists(rag_script_path)}")
-            
-            # Use subprocess to call the rag_single.py script
-            print("🔄 Calling rag_single.py...")
-            
-            # Use the full job text for better analysis
-            result = subprocess.run([
-                'python3', rag_script_path,
-                '--text', job_text
-            ], capture_output=True, text=True, timeout=None, cwd=scripts_dir)
-            
-            print(f"📊 Subprocess return code: {result.returncode}")
-            print(f"📄 STDOUT length: {len(result.stdout)}")
-            print(f"📄 STDOUT preview: {result.stdout[:500]}...")
-            print(f"❌ STDERR: {result.stderr}")
-            
-            if result.returncode == 0 and result.stdout.strip():
-                print("✅ Successfully got output from rag_single.py")
-                output = result.stdout.strip()
-                parsed_result = parse_rag_single_output(output)
-                parsed_result['method'] = 'RAG Single LLM'
-            else:
-                print("❌ rag_single.py failed or returned empty output")
-                raise Exception(f"Script failed: {result.stderr}")
-                
-        except subprocess.TimeoutExpired:
-            print("⏰ rag_single.py timed out")
-            parsed_result = simple_analysis(job_text)
-            parsed_result['method'] = 'timeout_fallback'
+            print("🔄 Calling rag_single.evaluate...")
+            output = rag_single.evaluate(job_text)
+            print(f"📄 Output preview: {output[:500]}...")
+            parsed_result = parse_rag_single_output(output)
+            parsed_result['method'] = 'RAG Single LLM'
             
         except Exception as e:
             print(f"❌ RAG single analysis failed: {e}")
@@ -1015,6 +1034,10 @@ def analyze_job():
         traceback.print_exc()
         return jsonify({'error': f'Analysis failed: {str(e)}'})
 
+BATCH_SCAM_INDICATORS = ['ssn', 'social security', '$5000', '$8000', '$10000', '@gmail.com', '@yahoo.com', 'no experience', 'immediately']
+BATCH_SCAM_KEYWORDS = [(indicator, indicator) for indicator in BATCH_SCAM_INDICATORS]
+BATCH_SCAM_AUTOMATON = _build_keyword_automaton(BATCH_SCAM_KEYWORDS)
+
 @app.route('/analyze-batch', methods=['POST'])
 @cross_origin()
 def analyze_batch_jobs():
@@ -1035,8 +1058,7 @@ def analyze_batch_jobs():
             job_text = f"TITLE: {row.get('job_title', '')} | COMPANY: {row.get('company', '')} | DESCRIPTION: {row.get('description', '')} | REQUIREMENTS: {row.get('requirements', '')}"
             
             # Simple analysis for batch processing
-            is_scam = any(indicator in job_text.lower() for indicator in 
-                         ['ssn', 'social security', '$5000', '$8000', '$10000', '@gmail.com', '@yahoo.com', 'no experience', 'immediately'])
+            is_scam = bool(_scan(BATCH_SCAM_AUTOMATON, BATCH_SCAM_KEYWORDS, job_text.lower()))
             
             results.append({
                 'job_title': row.get('job_title', ''),
@@ -1071,12 +1093,11 @@ def get_stats():
     avg_time = analysis_stats['total_analysis_time'] / max(analysis_stats['total_analysis'], 1)
     accuracy_rate = (analysis_stats['scams_detected'] / max(analysis_stats['total_analysis'], 1)) * 100
     
-    # Get top common patterns
-    common_patterns = sorted(
-        [{'pattern': k, 'count': v} for k, v in analysis_stats['common_patterns'].items()],
-        key=lambda x: x['count'],
-        reverse=True
-    )[:5]
+    # Get top common patterns (partial top-5 selection; same result as sorting and slicing)
+    common_patterns = [
+        {'pattern': k, 'count': v}
+        for k, v in heapq.nlargest(5, analysis_stats['common_patterns'].items(), key=lambda x: x[1])
+    ]
     
     return jsonify({
         'total_analysis': analysis_stats['total_analysis'],
@@ -1110,4 +1131,5 @@ if __name__ == '__main__':
     print("   • Real-time statistics")
     print("   • Professional user interface")
     print("\nPress Ctrl+C to stop the server")
+    rag_single._get_corpus()  # load the corpus + TF-IDF once, before the first request
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+# eval_wrapper.py and new_set.csv live one level up; resolve them from here rather than the cwd
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import eval_wrapper
+
+# every dataset CSV in the repo; each must give the same posting text and labels with and without pyarrow
+DATASETS = [ROOT / "new_set.csv", ROOT / "testing" / "archive" / "pare_post.csv"]
+
+
+def load(path, use_pyarrow):
+    """(texts, labels, label column) from eval_wrapper.load_dataset with pyarrow switched on or off."""
+    eval_wrapper.HAVE_PYARROW = use_pyarrow
+    df, label_col = eval_wrapper.load_dataset(str(path))
+    return df["__text__"].tolist(), df["__label__"].tolist(), label_col
+
+
+def run():
+    """Load each dataset through both parsers and print whether they agree; returns True if all do."""
+    if not eval_wrapper.HAVE_PYARROW:
+        print("pyarrow is not installed; only the C engine is available, nothing to compare")
+        return True
+    all_ok = True
+    for path in DATASETS:
+        with_arrow = load(path, True)
+        without = load(path, False)
+        ok = with_arrow == without
+        all_ok = all_ok and ok
+        print(f"{path.relative_to(ROOT)}: {len(with_arrow[0])} rows, label column {with_arrow[2]!r} -> {'ok' if ok else 'MISMATCH'}")
+    eval_wrapper.HAVE_PYARROW = True
+    return all_ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
\ No newline at end of file
@@ -1,28 +1,17 @@
 import requests
-import json
 import csv
-import random
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 # input testing file name here
 filename = "archive/new_set.csv"
-total = 0
-correct = 0
+limit = 20  # rows to evaluate
+workers = 4  # concurrent requests; match the Ollama server's OLLAMA_NUM_PARALLEL
 
 
-with open("results.csv", "w", newline='', encoding='utf-8') as outfile:
-    writer = csv.writer(outfile)
-    writer.writerow(["Index", "True Label", "Predicted Label", "Reasoning", "Full Output"])
-
-    with open(filename, newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        for i, row in enumerate(reader):
-            if i >= 20:
-                break
-
-            classification = int(row[-1].strip())
-            row_text = " ".join(row[:-1]).strip()
-
-            prompt = f"""
+def classify(row_text):
+    """Ask the model about one posting; returns (predicted_label, lowercased output). 0=REAL, 1=FAKE, 2=UNKNOWN."""
+    prompt = f"""
                 You are a strict classifier. 
                 Classify the following job posting as REAL, FAKE, or UNKNOWN.
 
@@ -34,37 +23,61 @@ with open("results.csv", "w", newline='', encoding='utf-8') as outfile:
                 {row_text}
                 """
 
-            response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={"model": "mistral:7b", "prompt": prompt}
-            )
-
-            output = ""
-            for line in response.iter_lines():
-                if line:
-                    output += json.loads(line.decode())["response"]
-
-            output = output.lower()
-            # Try to extract after "final answer:"
-            if "final answer:" in output:
-                final_answer = output.split("final answer:")[-1].strip()
-            else:
-                final_answer = output.strip()
-
-            predicted_label = (
-                0 if "real" in final_answer else
-                1 if "fake" in final_answer else
-                2
-            )
-
-            if predicted_label == classification:
-                correct += 1
-            total += 1
-
-            reasoning = output.split("final answer:")[0].strip() if "final answer:" in output else ""
-            writer.writerow([i, classification, predicted_label, reasoning, output])
-            print(f"[{i}] True: {classification}, Predicted: {predicted_label}")  # add this to the print statement if you wish to see the model output in real time, otherwise it's in the csv file Output: {output}")
-
-# Show accuracy
-accuracy = correct / total if total > 0 else 0
-print(f"\nAccuracy: {accuracy:.2%}")
\ No newline at end of file
+    # one JSON body for the whole answer instead of a json.loads per streamed token
+    response = requests.post(
+        "http://localhost:11434/api/generate",
+        json={"model": "mistral:7b", "prompt": prompt, "stream": False}
+    )
+
+    output = response.json()["response"]
+
+    output = output.lower()
+    # Try to extract after "final answer:"
+    if "final answer:" in output:
+        final_answer = output.split("final answer:")[-1].strip()
+    else:
+        final_answer = output.strip()
+
+    predicted_label = (
+        0 if "real" in final_answer else
+        1 if "fake" in final_answer else
+        2
+    )
+    return predicted_label, output
+
+
+def run(filename=filename, limit=limit):
+    """Classify the first `limit` rows of `filename`, write results.csv and print accuracy; returns (true, predicted) labels."""
+    # read the rows up front so the requests can all be in flight together
+    with open(filename, newline='', encoding='utf-8') as csvfile:
+        rows = list(islice(csv.reader(csvfile), limit))
+    true_labels = [int(row[-1].strip()) for row in rows]
+    row_texts = [" ".join(row[:-1]).strip() for row in rows]
+    predicted_labels = []
+
+    with open("results.csv", "w", buffering=1 << 20, newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(["Index", "True Label", "Predicted Label", "Reasoning", "Full Output"])
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map() yields in row order, so results.csv and the log keep the dataset order
+            results = executor.map(classify, row_texts)
+            for i, (classification, (predicted_label, output)) in enumerate(zip(true_labels, results)):
+                predicted_labels.append(predicted_label)
+
+                reasoning = output.split("final answer:")[0].strip() if "final answer:" in output else ""
+                # one physical line per row: escape newlines instead of emitting quoted multiline fields
+                writer.writerow([i, classification, predicted_label,
+                                 reasoning.replace("\n", "\\n"), output.replace("\n", "\\n")])
+                print(f"[{i}] True: {classification}, Predicted: {predicted_label}")  # add this to the print statement if you wish to see the model output in real time, otherwise it's in the csv file Output: {output}")
+
+    # Show accuracy
+    total = len(true_labels)
+    correct = sum(t == p for t, p in zip(true_labels, predicted_labels))
+    accuracy = correct / total if total > 0 else 0
+    print(f"\nAccuracy: {accuracy:.2%}")
+    return true_labels, predicted_labels
+
+
+if __name__ == "__main__":
+    run()
\ No newline at end of file